@@ -5,31 +5,209 @@ import time
 import argparse
 import logging
 import re
-from urllib.parse import urlparse, urljoin
+import functools
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote, urlparse, urljoin
+from urllib.robotparser import RobotFileParser
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util.retry import Retry
+
+try:  # optional: faster JSON parse/dump, falls back to the stdlib json module
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional: C-backed HTML parser (lexbor in selectolax>=1.0), falls back to HREF_REGEX when missing
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
 
 PLACES_BASE = "https://places.googleapis.com/v1"
 GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
-
-# Domains that still count as "no real website" (you can add/remove)
-LOW_EFFORT_DOMAINS = {
+PLACE_DETAILS_URL = f"{PLACES_BASE}/places/"
+
+# Field masks. Search asks for everything a lead row needs, so Details is rarely required.
+TEXT_SEARCH_MASK = (
+    "places.id,"
+    "places.displayName,"
+    "places.formattedAddress,"
+    "places.rating,"
+    "places.userRatingCount,"
+    "places.nationalPhoneNumber,"
+    "places.websiteUri,"
+    "places.googleMapsUri"
+)
+DETAILS_MASK = (
+    "id,"
+    "displayName,"
+    "formattedAddress,"
+    "rating,"
+    "userRatingCount,"
+    "nationalPhoneNumber,"
+    "websiteUri,"
+    "googleMapsUri"
+)
+
+# Domains that still count as "no real website" (you can add/remove).
+# Subdomains match too, e.g. m.facebook.com or maps.app.goo.gl.
+LOW_EFFORT_SUFFIXES = frozenset({
     "facebook.com",
-    "www.facebook.com",
-    "m.facebook.com",
     "instagram.com",
-    "www.instagram.com",
     "yelp.com",
-    "www.yelp.com",
     "linktr.ee",
-    "www.linktr.ee",
     "goo.gl",
-    "maps.app.goo.gl",
+})
+
+# Niche -> Places (New) primary type, used for hard-radius Nearby Search.
+# Keys are lowercase singular; niches without a match fall back to biased Text Search.
+NICHE_PLACE_TYPES = {
+    "bakery": "bakery",
+    "barber": "barber_shop",
+    "barbershop": "barber_shop",
+    "beauty salon": "beauty_salon",
+    "cafe": "cafe",
+    "car wash": "car_wash",
+    "dentist": "dentist",
+    "electrician": "electrician",
+    "florist": "florist",
+    "gym": "gym",
+    "hair salon": "hair_salon",
+    "hairdresser": "hair_salon",
+    "locksmith": "locksmith",
+    "mechanic": "car_repair",
+    "nail salon": "nail_salon",
+    "painter": "painter",
+    "plumber": "plumber",
+    "restaurant": "restaurant",
+    "roofer": "roofing_contractor",
+    "spa": "spa",
+    "takeaway": "meal_takeaway",
+    "takeaway restaurant": "meal_takeaway",
 }
+NEARBY_MAX_RADIUS_M = 50_000.0
+
+# Backoff (seconds) when Places rejects a fresh pageToken with 400 INVALID_ARGUMENT.
+PAGE_TOKEN_RETRY_DELAYS = (0.5, 1.0)
 
 # Email + contact page heuristics
-EMAIL_REGEX = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+# Bounded quantifiers (RFC 5321 length limits) keep matches short on garbage input.
+EMAIL_REGEX = re.compile(r"[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9.-]{1,255}\.[a-zA-Z]{2,24}")
+# <script>/<style> blocks are stripped before the email scan; JSON-LD is kept (it often holds "email").
+STRIPPED_TAGS = ("script", "style")
+MAX_EMAIL_SCAN_CHARS = 512_000
 CONTACT_HINTS = ("contact", "contact-us", "get-in-touch", "about", "about-us", "impressum", "support")
+CONTACT_HINT_REGEX = re.compile("|".join(re.escape(hint) for hint in CONTACT_HINTS), re.IGNORECASE)
+PREFERRED_EMAIL_LOCALPARTS = frozenset({"contact", "info", "hello", "sales"})
+MAILTO_REGEX = re.compile(r'href=["\']mailto:([^"\'?]+)', re.IGNORECASE)
+HREF_REGEX = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Concurrency: places processed in parallel, contact pages fetched in parallel per site,
+# and the Place Details request rate (per second) shared by all workers.
+PLACE_WORKERS = 20
+PAGE_WORKERS = 6
+PLACES_QPS = 10
+
+# Cap on in-flight website fetches across all workers. Nested place/page pools could
+# otherwise reach PLACE_WORKERS * PAGE_WORKERS concurrent scrapes.
+SCRAPE_CONCURRENCY = 50
+
+# Use a realistic UA. Some sites block Python default UAs.
+USER_AGENT = "Mozilla/5.0 (compatible; LeadFinderBot/1.0; +https://example.com/bot)"
+# Token matched against robots.txt User-agent groups.
+ROBOTS_USER_AGENT = "LeadFinderBot"
+# Origins asking for a longer Crawl-delay (seconds) than this are skipped, not waited on.
+MAX_CRAWL_DELAY = 5.0
+
+# Business sites: (connect, read) timeouts so dead hosts fail fast, and a per-host
+# circuit breaker that stops trying a host after this many consecutive failures.
+FETCH_TIMEOUT = (3, 10)
+ROBOTS_TIMEOUT = (3, 5)
+HOST_FAILURE_LIMIT = 3
+# Pages are streamed: anything declaring more than MAX_CONTENT_LENGTH bytes is skipped,
+# and at most MAX_HTML_BYTES of the body is read.
+MAX_CONTENT_LENGTH = 2_000_000
+MAX_HTML_BYTES = 1_000_000
+
+
+# ----------------------------
+# Shared HTTP session
+# ----------------------------
+def build_session() -> requests.Session:
+    """
+    One pooled session for every HTTP call (Places API + business sites).
+    Keeps TCP/TLS connections alive between requests and retries transient errors.
+    Google APIs get a more patient retry policy than scraped business sites.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    google = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+    )
+    sites = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=Retry(
+            total=2,
+            connect=2,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["GET"]),
+            # A business site's Retry-After (often minutes or hours) would stall the worker.
+            respect_retry_after_header=False,
+            # Hand back the final 5xx/429 response instead of raising RetryError, so the
+            # circuit breaker only counts hosts that fail to respond at all.
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", sites)
+    session.mount("https://", sites)
+    # Longest prefix wins, so these override the generic https:// adapter.
+    session.mount("https://places.googleapis.com/", google)
+    session.mount("https://maps.googleapis.com/", google)
+    return session
+
+
+_SESSION = build_session()
+_SCRAPE_SLOTS = threading.BoundedSemaphore(SCRAPE_CONCURRENCY)
+
+# Per-run memo of normalized website URL -> (email, email_source), shared by worker threads.
+_WEBSITE_EMAIL_CACHE: dict[str, tuple[str, str]] = {}
+_WEBSITE_EMAIL_LOCK = threading.Lock()
+
+# Per-run robots.txt parsers and last fetch time, keyed by scheme://host.
+_ROBOTS: dict[str, RobotFileParser | None] = {}
+_ROBOTS_LOCK = threading.Lock()
+_LAST_FETCH: dict[str, float] = {}
+_LAST_FETCH_LOCK = threading.Lock()
+_HOST_FAILURES: dict[str, int] = {}
+_HOST_FAILURES_LOCK = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Token bucket shared across threads.
+    Allows `rate` acquisitions per second; each token is handed back one second after use.
+    """
+
+    def __init__(self, rate: int):
+        self._tokens = threading.Semaphore(max(1, rate))
+
+    def acquire(self) -> None:
+        self._tokens.acquire()
+        refill = threading.Timer(1.0, self._tokens.release)
+        refill.daemon = True
+        refill.start()
 
 
 # ----------------------------
@@ -70,6 +248,7 @@ def require_api_key() -> str:
 # ----------------------------
 # Utilities
 # ----------------------------
+@functools.lru_cache(maxsize=4096)
 def domain_of(url: str) -> str:
     """Extract domain from a URL safely."""
     try:
@@ -78,6 +257,14 @@ def domain_of(url: str) -> str:
         return ""
 
 
+def normalize_url(url: str) -> str:
+    """Cache key for a website: lowercase scheme/host, no fragment or trailing slash."""
+    parts = urlparse(url)
+    path = parts.path.rstrip("/")
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{path}{query}"
+
+
 def is_low_effort_or_missing_website(website_uri: str | None) -> tuple[bool, str]:
     """
     Return (is_lead, reason).
@@ -86,50 +273,220 @@ def is_low_effort_or_missing_website(website_uri: str | None) -> tuple[bool, str
     if not website_uri:
         return True, "missing_website"
     d = domain_of(website_uri)
-    if d in LOW_EFFORT_DOMAINS:
+    host = d.partition(":")[0]
+    if any(host == suffix or host.endswith("." + suffix) for suffix in LOW_EFFORT_SUFFIXES):
         return True, f"low_effort_domain:{d}"
     return False, f"has_website:{d or 'unknown'}"
 
 
 def pretty_json(obj: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode()
     return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=True)
 
 
+def parse_json_response(r: requests.Response) -> dict:
+    """Decode a JSON response body (orjson if installed)."""
+    if orjson is not None:
+        return orjson.loads(r.content)
+    return r.json()
+
+
 # ----------------------------
 # Email scraping helpers
 # ----------------------------
+def strip_scripts_and_styles(html: str) -> str:
+    """
+    Remove <script>/<style> blocks (JSON-LD scripts are kept) in one left-to-right pass.
+    Uses str.find only, so the cost stays linear on hostile markup; an unclosed block
+    (or unterminated tag) cuts the rest of the document.
+    """
+    lower = html.lower()
+    # Next known position of each opener; only re-searched once the cursor passes it.
+    next_open = {tag: lower.find("<" + tag) for tag in STRIPPED_TAGS}
+    out: list[str] = []
+    pos = 0
+
+    while True:
+        for tag, idx in next_open.items():
+            if 0 <= idx < pos:
+                next_open[tag] = lower.find("<" + tag, pos)
+        found = [(idx, tag) for tag, idx in next_open.items() if idx >= 0]
+        if not found:
+            out.append(html[pos:])
+            break
+        start, tag = min(found)
+
+        name_end = start + 1 + len(tag)
+        if name_end < len(lower) and (lower[name_end].isalnum() or lower[name_end] in "-_:"):
+            # e.g. <scripts> or <style-guide>: not the tag we're looking for
+            out.append(html[pos:name_end])
+            pos = name_end
+            continue
+
+        open_end = lower.find(">", name_end)
+        if open_end == -1:
+            out.append(html[pos:start])
+            break
+
+        close = lower.find("</" + tag, open_end)
+        keep = tag == "script" and "ld+json" in lower[name_end:open_end]
+        if close == -1:
+            out.append(html[pos:] if keep else html[pos:start])
+            break
+
+        close_end = lower.find(">", close)
+        block_end = len(html) if close_end == -1 else close_end + 1
+        out.append(html[pos:block_end] if keep else html[pos:start])
+        pos = block_end
+
+    return "".join(out)
+
+
 def extract_emails_from_html(html: str) -> set[str]:
-    """Return a set of emails found in HTML text."""
+    """Return a set of emails found in HTML text (scripts/styles skipped, input capped)."""
     if not html:
         return set()
-    return set(re.findall(EMAIL_REGEX, html))
+    html = strip_scripts_and_styles(html[:MAX_EMAIL_SCAN_CHARS])
+    return set(EMAIL_REGEX.findall(html))
+
 
+def extract_mailto_emails(html: str) -> set[str]:
+    """Return emails from <a href="mailto:..."> links (the cheapest, most deliberate source)."""
+    if not html:
+        return set()
+    return {email for target in MAILTO_REGEX.findall(html) for email in EMAIL_REGEX.findall(unquote(target))}
 
-def fetch_html(url: str, *, dry_run: bool, timeout: int = 12) -> str:
+
+def pick_email(emails: set[str]) -> str:
+    """Pick one email: generic business inboxes (info@, contact@, ...) first, then alphabetical."""
+    return min(emails, key=lambda e: (e.split("@", 1)[0].lower() not in PREFERRED_EMAIL_LOCALPARTS, e))
+
+
+def origin_of(url: str) -> str:
+    """Return scheme://host for a URL (the robots.txt scope)."""
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def robots_for(origin: str) -> RobotFileParser | None:
+    """
+    Load robots.txt once per origin.
+    Mirrors RobotFileParser.read(): 401/403 disallow everything, other statuses allow everything.
+    Returns None (also cached) when the host didn't answer at all, so callers skip it.
+    """
+    with _ROBOTS_LOCK:
+        if origin in _ROBOTS:
+            return _ROBOTS[origin]
+
+    robots_url = f"{origin}/robots.txt"
+    rp = RobotFileParser(robots_url)
+    try:
+        r = _SESSION.get(robots_url, timeout=ROBOTS_TIMEOUT, allow_redirects=True)
+        if r.status_code in (401, 403):
+            rp.disallow_all = True
+        elif r.status_code == 200:
+            rp.parse(r.text.splitlines())
+        else:
+            rp.allow_all = True
+    except requests.RequestException:
+        record_host_result(origin, ok=False)
+        rp = None
+
+    with _ROBOTS_LOCK:
+        return _ROBOTS.setdefault(origin, rp)
+
+
+def record_host_result(origin: str, *, ok: bool) -> None:
+    """Track consecutive connection failures per origin (any response resets the count)."""
+    with _HOST_FAILURES_LOCK:
+        _HOST_FAILURES[origin] = 0 if ok else _HOST_FAILURES.get(origin, 0) + 1
+
+
+def host_is_blackholed(origin: str) -> bool:
+    with _HOST_FAILURES_LOCK:
+        return _HOST_FAILURES.get(origin, 0) >= HOST_FAILURE_LIMIT
+
+
+def wait_for_crawl_delay(origin: str, delay: float) -> None:
+    """Space requests to one origin at least `delay` seconds apart (reserves a slot, then sleeps)."""
+    with _LAST_FETCH_LOCK:
+        now = time.monotonic()
+        slot = max(now, _LAST_FETCH.get(origin, 0.0) + delay)
+        _LAST_FETCH[origin] = slot
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def fetch_html(url: str, *, dry_run: bool, timeout: float | tuple[float, float] = FETCH_TIMEOUT) -> str:
     """
     Fetch HTML from a URL.
+    - Skips hosts that keep failing to connect/respond
+    - Respects robots.txt (Disallow + Crawl-delay)
     - Follows redirects
-    - Ensures Content-Type is HTML
+    - Ensures Content-Type is HTML before downloading the body
+    - Reads at most MAX_HTML_BYTES
     """
     if dry_run:
         return ""
+    return _fetch_html_cached(url, timeout)
+
+
+def _read_html_body(r: requests.Response) -> bytes:
+    """Return up to MAX_HTML_BYTES of an HTML 200 response, or b"" if it isn't one worth reading."""
+    if r.status_code != 200:
+        return b""
+    content_type = (r.headers.get("Content-Type") or "").lower()
+    if "text/html" not in content_type:
+        return b""
+    content_length = r.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > MAX_CONTENT_LENGTH:
+        return b""
+    return r.raw.read(MAX_HTML_BYTES, decode_content=True)
+
+
+@functools.lru_cache(maxsize=2048)
+def _fetch_html_cached(url: str, timeout: float | tuple[float, float]) -> str:
+    """Fetch each URL at most once per run (fallback contact paths repeat across places)."""
+    origin = origin_of(url)
+    if host_is_blackholed(origin):
+        return ""
+
+    rp = robots_for(origin)
+    if rp is None:
+        return ""
+    if not rp.can_fetch(ROBOTS_USER_AGENT, url):
+        logging.debug("robots.txt disallows %s", url)
+        return ""
+
+    delay = float(rp.crawl_delay(ROBOTS_USER_AGENT) or 0)
+    if delay > MAX_CRAWL_DELAY:
+        logging.debug("Skipping %s: robots.txt Crawl-delay %.0fs exceeds %.0fs", url, delay, MAX_CRAWL_DELAY)
+        return ""
+    if delay:
+        wait_for_crawl_delay(origin, delay)
 
     try:
-        headers = {
-            # Use a realistic UA. Some sites block Python default UAs.
-            "User-Agent": "Mozilla/5.0 (compatible; LeadFinderBot/1.0; +https://example.com/bot)"
-        }
-        r = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-        if r.status_code != 200:
-            return ""
-        content_type = (r.headers.get("Content-Type") or "").lower()
-        if "text/html" not in content_type:
-            return ""
-        return r.text or ""
+        with _SCRAPE_SLOTS, _SESSION.get(url, timeout=timeout, allow_redirects=True, stream=True) as r:
+            body = _read_html_body(r)
+        # Only a fully handled response counts as the host being healthy.
+        record_host_result(origin, ok=True)
+        return body.decode(r.encoding or "utf-8", errors="replace")
+    except (requests.RequestException, Urllib3HTTPError):
+        # r.raw.read() bypasses requests, so body timeouts/broken streams raise urllib3 errors.
+        record_host_result(origin, ok=False)
+        return ""
     except Exception:
         return ""
 
 
+def extract_hrefs(html: str) -> list[str]:
+    """Return every <a href> value in document order (selectolax if installed, else regex)."""
+    if HTMLParser is None:
+        return HREF_REGEX.findall(html)
+    return [a.attributes.get("href") or "" for a in HTMLParser(html).css("a[href]")]
+
+
 def find_candidate_pages(base_url: str, html: str) -> list[str]:
     """
     Extract candidate pages (contact/about/etc.) from <a href="..."> links.
@@ -138,7 +495,7 @@ def find_candidate_pages(base_url: str, html: str) -> list[str]:
     if not html:
         return []
 
-    hrefs = re.findall(r'href=["\']([^"\']+)["\']', html, flags=re.IGNORECASE)
+    hrefs = extract_hrefs(html)
 
     candidates: list[str] = []
     for href in hrefs:
@@ -148,7 +505,7 @@ def find_candidate_pages(base_url: str, html: str) -> list[str]:
         if href_lower.startswith(("mailto:", "tel:", "javascript:", "#")):
             continue
 
-        if any(hint in href_lower for hint in CONTACT_HINTS):
+        if CONTACT_HINT_REGEX.search(href_lower):
             candidates.append(urljoin(base_url, href))
 
     # Also try common paths even if not linked in nav/footer
@@ -173,24 +530,42 @@ def extract_email_from_website(website: str, *, dry_run: bool, debug: bool) -> t
     - best candidate contact/about pages
 
     Returns (email, email_source).
+    Results are cached per normalized URL, so places listing the same website are scraped once.
     """
     if not website or dry_run:
         return "", ""
 
+    key = normalize_url(website)
+    with _WEBSITE_EMAIL_LOCK:
+        cached = _WEBSITE_EMAIL_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    result = _scrape_email_from_website(website, dry_run=dry_run, debug=debug)
+    with _WEBSITE_EMAIL_LOCK:
+        _WEBSITE_EMAIL_CACHE[key] = result
+    return result
+
+
+def _scrape_email_from_website(website: str, *, dry_run: bool, debug: bool) -> tuple[str, str]:
+    """Homepage first, then candidate pages; mailto links win over loose text matches. Returns (email, email_source)."""
     # 1) homepage
     html = fetch_html(website, dry_run=dry_run)
-    emails = extract_emails_from_html(html)
+    emails = extract_mailto_emails(html) or extract_emails_from_html(html)
     if emails:
-        email = sorted(emails)[0]
+        email = pick_email(emails)
         return email, "homepage"
 
-    # 2) linked candidate pages + common paths
-    for page_url in find_candidate_pages(website, html):
-        page_html = fetch_html(page_url, dry_run=dry_run)
-        emails = extract_emails_from_html(page_html)
-        if emails:
-            email = sorted(emails)[0]
-            return email, f"page:{page_url}"
+    # 2) linked candidate pages + common paths, fetched in parallel.
+    # Results are checked in candidate order so the best-ranked page still wins.
+    pages = find_candidate_pages(website, html)
+    if pages:
+        with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, len(pages))) as pool:
+            for page_url, page_html in zip(pages, pool.map(lambda u: fetch_html(u, dry_run=dry_run), pages)):
+                emails = extract_mailto_emails(page_html) or extract_emails_from_html(page_html)
+                if emails:
+                    email = pick_email(emails)
+                    return email, f"page:{page_url}"
 
     if debug:
         logging.debug("No email found on website=%s", website)
@@ -213,9 +588,9 @@ def http_get(
     if dry_run:
         return {"DRY_RUN": True, "method": "GET", "url": url, "params": params, "headers": headers}
 
-    r = requests.get(url, params=params, headers=headers, timeout=timeout)
+    r = _SESSION.get(url, params=params, headers=headers, timeout=timeout)
     r.raise_for_status()
-    return r.json()
+    return parse_json_response(r)
 
 
 def http_post(
@@ -230,9 +605,9 @@ def http_post(
     if dry_run:
         return {"DRY_RUN": True, "method": "POST", "url": url, "json": json_body, "headers": headers}
 
-    r = requests.post(url, json=json_body, headers=headers, timeout=timeout)
+    r = _SESSION.post(url, json=json_body, headers=headers, timeout=timeout)
     r.raise_for_status()
-    return r.json()
+    return parse_json_response(r)
 
 
 def geocode_city_country(api_key: str, city_country: str, *, dry_run: bool, debug: bool) -> tuple[float, float]:
@@ -270,13 +645,26 @@ def places_post(api_key: str, path: str, body: dict, field_mask: str, *, dry_run
     return data
 
 
-def places_get_details(api_key: str, place_id: str, field_mask: str, *, dry_run: bool, debug: bool) -> dict:
-    """GET Place Details (New) with FieldMask."""
-    headers = {
-        "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": field_mask,
-    }
-    url = f"{PLACES_BASE}/places/{place_id}"
+def places_post_page(api_key: str, path: str, body: dict, field_mask: str, *, dry_run: bool, debug: bool) -> dict:
+    """
+    places_post for paginated searches.
+    Places (New) page tokens are valid immediately, so there is no fixed wait between pages;
+    if a token is still rejected (HTTP 400), retry after each PAGE_TOKEN_RETRY_DELAYS step.
+    """
+    for delay in (*PAGE_TOKEN_RETRY_DELAYS, None):
+        try:
+            return places_post(api_key, path, body, field_mask, dry_run=dry_run, debug=debug)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if delay is None or status != 400 or "pageToken" not in body:
+                raise
+            logging.debug("Places %s rejected pageToken; retrying in %.1fs", path, delay)
+            time.sleep(delay)
+
+
+def places_get_details(place_id: str, headers: dict, *, dry_run: bool, debug: bool) -> dict:
+    """GET Place Details (New). `headers` (API key + FieldMask) is pre-built once per run by the caller."""
+    url = PLACE_DETAILS_URL + place_id
     data = http_get(url, headers=headers, timeout=30, dry_run=dry_run)
 
     if debug:
@@ -293,15 +681,6 @@ def text_search(api_key: str, niche: str, location: str, max_pages: int, *, dry_
     """Places Text Search (New): searches by textQuery like 'barbers in London, UK'."""
     text_query = f"{niche} in {location}"
 
-    field_mask = (
-        "places.id,"
-        "places.displayName,"
-        "places.formattedAddress,"
-        "places.rating,"
-        "places.userRatingCount,"
-        "places.nationalPhoneNumber"
-    )
-
     results: list[dict] = []
     next_token = None
 
@@ -310,7 +689,7 @@ def text_search(api_key: str, niche: str, location: str, max_pages: int, *, dry_
         if next_token:
             body["pageToken"] = next_token
 
-        data = places_post(api_key, "places:searchText", body, field_mask, dry_run=dry_run, debug=debug)
+        data = places_post_page(api_key, "places:searchText", body, TEXT_SEARCH_MASK, dry_run=dry_run, debug=debug)
 
         if dry_run:
             data = {
@@ -322,6 +701,7 @@ def text_search(api_key: str, niche: str, location: str, max_pages: int, *, dry_
                         "rating": 4.6,
                         "userRatingCount": 128,
                         "nationalPhoneNumber": "+44 20 0000 0001",
+                        "googleMapsUri": "https://maps.google.com/?q=place_id:DRY_PLACE_1",
                     },
                     {
                         "id": "DRY_PLACE_2",
@@ -330,6 +710,7 @@ def text_search(api_key: str, niche: str, location: str, max_pages: int, *, dry_
                         "rating": 4.3,
                         "userRatingCount": 34,
                         "nationalPhoneNumber": "+44 20 0000 0002",
+                        # No websiteUri/googleMapsUri: exercises the Place Details fallback.
                     },
                 ]
             }
@@ -340,7 +721,8 @@ def text_search(api_key: str, niche: str, location: str, max_pages: int, *, dry_
         if not next_token:
             break
 
-        time.sleep(2)  # allow nextPageToken to become valid
+        if os.getenv("PLACES_API_LEGACY"):
+            time.sleep(2)  # legacy Places API: nextPageToken needs a moment to become valid
 
     return results
 
@@ -357,15 +739,6 @@ def radius_search_via_text_bias(
     debug: bool,
 ) -> list[dict]:
     """Radius-ish search: Text Search with locationBias circle around lat/lng."""
-    field_mask = (
-        "places.id,"
-        "places.displayName,"
-        "places.formattedAddress,"
-        "places.rating,"
-        "places.userRatingCount,"
-        "places.nationalPhoneNumber"
-    )
-
     results: list[dict] = []
     next_token = None
 
@@ -379,7 +752,7 @@ def radius_search_via_text_bias(
         if next_token:
             body["pageToken"] = next_token
 
-        data = places_post(api_key, "places:searchText", body, field_mask, dry_run=dry_run, debug=debug)
+        data = places_post_page(api_key, "places:searchText", body, TEXT_SEARCH_MASK, dry_run=dry_run, debug=debug)
 
         if dry_run:
             data = {
@@ -391,6 +764,7 @@ def radius_search_via_text_bias(
                         "rating": 4.7,
                         "userRatingCount": 210,
                         "nationalPhoneNumber": "+44 20 0000 0101",
+                        "googleMapsUri": "https://maps.google.com/?q=place_id:DRY_RADIUS_1",
                     }
                 ]
             }
@@ -401,74 +775,107 @@ def radius_search_via_text_bias(
         if not next_token:
             break
 
-        time.sleep(2)
+        if os.getenv("PLACES_API_LEGACY"):
+            time.sleep(2)  # legacy Places API: nextPageToken needs a moment to become valid
 
     return results
 
 
-# ----------------------------
-# Main pipeline
-# ----------------------------
-def run_pipeline(
+def _type_for_niche(niche: str) -> str:
+    """Map a free-text niche ('Barbers', 'nail salons') to a Places type, or '' if unknown."""
+    key = " ".join(niche.lower().split())
+    return NICHE_PLACE_TYPES.get(key) or NICHE_PLACE_TYPES.get(key.removesuffix("s"), "")
+
+
+def nearby_search(
     api_key: str,
     niche: str,
-    location: str,
-    mode: str,
-    min_rating: float,
-    min_reviews: int,
-    max_pages: int,
-    radius_m: int | None,
+    place_type: str,
+    lat: float,
+    lng: float,
+    radius_m: int,
     *,
     dry_run: bool,
     debug: bool,
 ) -> list[dict]:
-    # 1) Search
-    if mode == "text":
-        places = text_search(api_key, niche, location, max_pages, dry_run=dry_run, debug=debug)
-    else:
-        lat, lng = geocode_city_country(api_key, location, dry_run=dry_run, debug=debug)
-        places = radius_search_via_text_bias(
-            api_key,
-            niche,
-            lat,
-            lng,
-            radius_m=radius_m or 3000,
-            max_pages=max_pages,
-            dry_run=dry_run,
-            debug=debug,
-        )
+    """Places Nearby Search (New): hard circle restriction + type filter. Single page, max 20 results."""
+    body = {
+        "includedTypes": [place_type],
+        "maxResultCount": 20,
+        "locationRestriction": {
+            "circle": {
+                "center": {"latitude": lat, "longitude": lng},
+                "radius": min(float(radius_m), NEARBY_MAX_RADIUS_M),
+            }
+        },
+    }
 
-    # 2) Deduplicate by place id
-    by_id: dict[str, dict] = {}
-    for p in places:
-        pid = p.get("id")
-        if pid and pid not in by_id:
-            by_id[pid] = p
-
-    logging.info("Found %d unique places (before filtering).", len(by_id))
-
-    # 3) Details + filter leads
-    details_mask = (
-        "id,"
-        "displayName,"
-        "formattedAddress,"
-        "rating,"
-        "userRatingCount,"
-        "nationalPhoneNumber,"
-        "websiteUri,"
-        "googleMapsUri"
-    )
+    data = places_post(api_key, "places:searchNearby", body, TEXT_SEARCH_MASK, dry_run=dry_run, debug=debug)
 
-    leads: list[dict] = []
+    if dry_run:
+        data = {
+            "places": [
+                {
+                    "id": "DRY_NEARBY_1",
+                    "displayName": {"text": f"{niche.title()} Nearby One"},
+                    "formattedAddress": "Inside your chosen radius",
+                    "rating": 4.7,
+                    "userRatingCount": 210,
+                    "nationalPhoneNumber": "+44 20 0000 0101",
+                    "googleMapsUri": "https://maps.google.com/?q=place_id:DRY_NEARBY_1",
+                }
+            ]
+        }
 
-    for pid, p in by_id.items():
-        rating = float(p.get("rating") or 0.0)
-        count = int(p.get("userRatingCount") or 0)
+    return data.get("places", [])
 
-        if rating < min_rating or count < min_reviews:
-            continue
 
-        d = places_get_details(api_key, pid, details_mask, dry_run=dry_run, debug=debug)
+# ----------------------------
+# Main pipeline
+# ----------------------------
+# CSV column order; every lead dict carries exactly these keys.
+CSV_FIELDS = (
+    "name",
+    "rating",
+    "reviews",
+    "phone",
+    "email",
+    "email_source",
+    "address",
+    "website",
+    "maps_url",
+    "reason",
+    "place_id",
+)
+
+
+def threshold_filter(min_rating: float, min_reviews: int) -> Callable[[dict], bool]:
+    """Build the rating/review predicate once per run (thresholds bound, no per-record coercion)."""
+
+    def passes(p: dict) -> bool:
+        return (p.get("rating") or 0.0) >= min_rating and (p.get("userRatingCount") or 0) >= min_reviews
+
+    return passes
+
+
+def _process_place(
+    pid: str,
+    p: dict,
+    details_headers: dict,
+    *,
+    limiter: RateLimiter,
+    dry_run: bool,
+    debug: bool,
+) -> dict | None:
+    """Fetch details + email for one search result. Returns a lead row, or None if it isn't a lead."""
+    # Search results carry the full details mask; websiteUri is simply absent when a
+    # place has no website. Only fall back to Place Details if the mask wasn't honoured.
+    if "googleMapsUri" in p:
+        d = p
+    else:
+        if not dry_run:
+            limiter.acquire()
+        d = places_get_details(pid, details_headers, dry_run=dry_run, debug=debug)
 
         if dry_run:
             fake_site = "" if "1" in pid else "https://www.facebook.com/example"
@@ -476,42 +883,140 @@ def run_pipeline(
                 "id": pid,
                 "displayName": {"text": (p.get("displayName") or {}).get("text", "")},
                 "formattedAddress": p.get("formattedAddress", ""),
-                "rating": rating,
-                "userRatingCount": count,
+                "rating": p.get("rating", ""),
+                "userRatingCount": p.get("userRatingCount", ""),
                 "nationalPhoneNumber": p.get("nationalPhoneNumber", ""),
                 "websiteUri": fake_site or None,
                 "googleMapsUri": f"https://maps.google.com/?q=place_id:{pid}",
             }
 
-        website = d.get("websiteUri")
-        email, email_source = extract_email_from_website(website or "", dry_run=dry_run, debug=debug)
+    website = d.get("websiteUri")
+    is_lead, reason = is_low_effort_or_missing_website(website)
+    if not is_lead:
+        return None
 
-        if debug:
-            logging.debug("Email extraction: website=%s email=%s source=%s", website, email, email_source)
+    # Only scrape emails for actual leads (no site, or a social/directory page).
+    email, email_source = extract_email_from_website(website or "", dry_run=dry_run, debug=debug)
 
-        is_lead, reason = is_low_effort_or_missing_website(website)
+    if debug:
+        logging.debug("Email extraction: website=%s email=%s source=%s", website, email, email_source)
+
+    return {
+        "name": (d.get("displayName") or {}).get("text", ""),
+        "rating": d.get("rating", ""),
+        "reviews": d.get("userRatingCount", ""),
+        "phone": d.get("nationalPhoneNumber", ""),
+        "email": email,
+        "email_source": email_source,
+        "address": d.get("formattedAddress", ""),
+        "website": website or "",
+        "maps_url": d.get("googleMapsUri", ""),
+        "reason": reason,
+        "place_id": d.get("id", pid),
+    }
 
-        if is_lead:
-            leads.append(
-                {
-                    "name": (d.get("displayName") or {}).get("text", ""),
-                    "rating": d.get("rating", ""),
-                    "reviews": d.get("userRatingCount", ""),
-                    "phone": d.get("nationalPhoneNumber", ""),
-                    "email": email,
-                    "email_source": email_source,
-                    "address": d.get("formattedAddress", ""),
-                    "website": website or "",
-                    "maps_url": d.get("googleMapsUri", ""),
-                    "reason": reason,
-                    "place_id": d.get("id", pid),
-                }
+
+def _enrich_places(by_id: dict[str, dict], details_headers: dict, *, dry_run: bool, debug: bool) -> Iterator[dict]:
+    """Process places on a thread pool (network-bound, so threads scale well); yields leads as they finish."""
+    limiter = RateLimiter(PLACES_QPS)
+
+    pool = ThreadPoolExecutor(max_workers=PLACE_WORKERS)
+    try:
+        futures = [
+            pool.submit(
+                _process_place,
+                pid,
+                p,
+                details_headers,
+                limiter=limiter,
+                dry_run=dry_run,
+                debug=debug,
             )
+            for pid, p in by_id.items()
+        ]
+        for future in as_completed(futures):
+            lead = future.result()
+            if lead:
+                yield lead
+    finally:
+        # On a worker error, Ctrl-C or the consumer stopping early, drop queued places
+        # instead of processing all of them before exiting.
+        pool.shutdown(cancel_futures=True)
 
-        if not dry_run:
-            time.sleep(0.1)
 
-    return leads
+def run_pipeline(
+    api_key: str,
+    niche: str,
+    location: str,
+    mode: str,
+    min_rating: float,
+    min_reviews: int,
+    max_pages: int,
+    radius_m: int | None,
+    *,
+    dry_run: bool,
+    debug: bool,
+) -> Iterator[dict]:
+    """
+    Search and filter places now, then return an iterator that enriches them and
+    yields lead rows as soon as each one is ready. Search errors (e.g. geocoding)
+    surface from this call, before the caller opens any output.
+    """
+    # 1) Search
+    if mode == "text":
+        places = text_search(api_key, niche, location, max_pages, dry_run=dry_run, debug=debug)
+    else:
+        lat, lng = geocode_city_country(api_key, location, dry_run=dry_run, debug=debug)
+        place_type = _type_for_niche(niche)
+        if place_type:
+            places = nearby_search(
+                api_key,
+                niche,
+                place_type,
+                lat,
+                lng,
+                radius_m=radius_m or 3000,
+                dry_run=dry_run,
+                debug=debug,
+            )
+        else:
+            logging.info("No Places type for niche '%s'; using Text Search with a location bias.", niche)
+            places = radius_search_via_text_bias(
+                api_key,
+                niche,
+                lat,
+                lng,
+                radius_m=radius_m or 3000,
+                max_pages=max_pages,
+                dry_run=dry_run,
+                debug=debug,
+            )
+
+    # 2) Filter by rating/reviews, then deduplicate by place id.
+    # When search already returned the website fields, places with a real website are
+    # dropped here: they can never be leads, so they need neither Details nor scraping.
+    by_id: dict[str, dict] = {}
+    seen_ids: set[str] = set()
+    skipped_with_website = 0
+    for p in filter(threshold_filter(min_rating, min_reviews), places):
+        pid = p.get("id")
+        if not pid or pid in seen_ids:
+            continue
+        seen_ids.add(pid)
+        if "googleMapsUri" in p and not is_low_effort_or_missing_website(p.get("websiteUri"))[0]:
+            skipped_with_website += 1
+            continue
+        by_id[pid] = p
+
+    logging.info(
+        "Found %d candidate places meeting rating/review thresholds (%d skipped: already have a website).",
+        len(by_id),
+        skipped_with_website,
+    )
+
+    # 3) Details + filter leads, lazily (workers start when the caller begins iterating)
+    details_headers = {"X-Goog-Api-Key": api_key, "X-Goog-FieldMask": DETAILS_MASK}
+    return _enrich_places(by_id, details_headers, dry_run=dry_run, debug=debug)
 
 
 def configure_logging(debug: bool) -> None:
@@ -567,6 +1072,7 @@ def main():
 
     logging.info("Mode=%s  Niche=%s  Location=%s  DryRun=%s", args.mode, args.niche, args.location, args.dry_run)
 
+    # Runs the search now; only enrichment is deferred until the rows are written.
     leads = run_pipeline(
         api_key=api_key,
         niche=args.niche,
@@ -580,36 +1086,32 @@ def main():
         debug=args.debug,
     )
 
-    logging.info("Leads found (no/low-effort website): %d", len(leads))
-
     output_filename = args.niche + '_' + args.out
     output_filename = output_filename.replace(" ", "_")
 
+    # Rows are written as each lead completes; only the preview is kept in memory.
+    leads_seen = 0
+    preview: list[dict] = []
+
+    def rows():
+        nonlocal leads_seen
+        for lead in leads:
+            leads_seen += 1
+            if len(preview) < 5:
+                preview.append(lead)
+            yield tuple(lead[k] for k in CSV_FIELDS)
+
     with open(output_filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "name",
-                "rating",
-                "reviews",
-                "phone",
-                "email",
-                "email_source",
-                "address",
-                "website",
-                "maps_url",
-                "reason",
-                "place_id",
-            ],
-        )
-        writer.writeheader()
-        writer.writerows(leads)
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        writer.writerows(rows())
 
+    logging.info("Leads found (no/low-effort website): %d", leads_seen)
     logging.info("Saved CSV: %s", output_filename)
 
-    if leads:
+    if preview:
         print("\nPreview (first 5 leads):")
-        for row in leads[:5]:
+        for row in preview:
             print(
                 f"- {row['name']} | {row['rating']} ({row['reviews']} reviews) | "
                 f"email={row['email'] or '—'} | {row['reason']} | {row['maps_url']}"
@@ -0,0 +1,29 @@
+import time
+
+import lead_finder
+
+
+def test_strip_scripts_and_styles_removes_blocks_keeps_json_ld():
+    html = (
+        'a<script>var x = "js@x.com";</script>b'
+        "<STYLE media=all>p{}</STYLE >c"
+        '<script type="application/ld+json">{"email": "ld@x.com"}</script>d'
+        "<scripts>not a script tag</scripts>"
+    )
+    assert lead_finder.strip_scripts_and_styles(html) == (
+        'abc<script type="application/ld+json">{"email": "ld@x.com"}</script>d'
+        "<scripts>not a script tag</scripts>"
+    )
+
+
+def test_strip_scripts_and_styles_cuts_unclosed_block():
+    assert lead_finder.strip_scripts_and_styles("hi@x.com<script>never closed") == "hi@x.com"
+    assert lead_finder.strip_scripts_and_styles("hi@x.com<style") == "hi@x.com"
+
+
+def test_extract_emails_from_html_is_linear_on_unclosed_scripts():
+    # Previously quadratic: each unclosed <script> scanned to the end of the input.
+    html = "<script>" * 64_000  # 512K chars, the scan cap
+    start = time.perf_counter()
+    assert lead_finder.extract_emails_from_html(html) == set()
+    assert time.perf_counter() - start < 1.0